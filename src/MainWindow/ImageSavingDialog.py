@@ -1,10 +1,8 @@
 """
 Create dialog(s) for changing image export settings; and success/error message.
 """
-import os
 import PySide6.QtCore as qtc
 import PySide6.QtWidgets as qtw
-from src.utilities import save_image
 
 # Quality selection dialog (depends on type of exported img)
 class SelectQualityDialog(qtw.QDialog):
@@ -73,39 +71,50 @@ class SelectQualityDialog(qtw.QDialog):
             self.spinBox.setValue(newValue)
 
 
-# Result dialog on image saved
+# Result dialog on image saved (reused between exports)
 class ResultDialog(qtw.QMessageBox):
-    def __init__(self, imgPath=None, errorStackTrace=None):
+    def __init__(self):
         super().__init__()
+        self.setStandardButtons(qtw.QMessageBox.Ok)
 
-        if imgPath == None:
+    def set_result(self, imgPath=None, errorStackTrace=None, fileSize=0):
+        """
+        Update dialog contents to the result of an export.
+        """
+        if imgPath == None or errorStackTrace != None:
             # Error msg
-            self.setStandardButtons(qtw.QMessageBox.Ok)
             self.setIcon(qtw.QMessageBox.Critical)
             self.setWindowTitle("Export failed")
             self.setText("Failed to export!\n")
             if errorStackTrace != None:
                 self.setInformativeText("Error stack trace:")
                 self.setDetailedText(str(errorStackTrace))
+            else:
+                self.setInformativeText("")
+                self.setDetailedText("")
 
-        elif imgPath != None and errorStackTrace == None:
+        else:
             # Success msg
-            self.setStandardButtons(qtw.QMessageBox.Ok)
             self.setIcon(qtw.QMessageBox.Information)
             self.setWindowTitle("Export success")
             self.setText(
                 "Successfully exported output image.\n"
                 + "File size is: "
-                + str(round(os.path.getsize(imgPath) / 1024 / 1024, 2))
+                + str(round(fileSize / 1024 / 1024, 2))
                 + "MB.\n"
             )
             self.setInformativeText("File location:\n" + imgPath)
+            self.setDetailedText("")
 
 
-def createDialog(imageArray, imType, imgPath):
+def createDialog(imType):
+    """
+    Ask user for quality/compression level (depends on image type).
+    Returns tuple (accepted, compressionFactor); compressionFactor is None for default.
+    """
     # Something went wrong
     if imType == None:
-        return
+        return False, None
 
     compressionFactor = None
     if imType == "JPG" or imType == "PNG":
@@ -114,8 +123,6 @@ def createDialog(imageArray, imType, imgPath):
         if qualityDialog.selectedQuality != None:
             compressionFactor = qualityDialog.selectedQuality
         else:
-            return
-
-    errorStackTrace = save_image(imageArray, imType, imgPath, compressionFactor)
+            return False, None
 
-    ResultDialog(imgPath, errorStackTrace).exec()
+    return True, compressionFactor
@@ -11,7 +11,6 @@ import PySide6.QtWidgets as qtw
 import src.ImageLoadingHandler as ImageLoadingHandler
 import src.MainWindow.MainLayout.ImageWidgets as ImageWidgets
 import src.MainWindow.MainLayout.ImageViewers as ImageViewers
-from src.utilities import int_string_sorting
 import src.settings as settings
 
 
@@ -86,7 +85,7 @@ class CenterWidget(qtw.QWidget):
         self.RetouchingViewer.set_retouch_image(None)
         self.RetouchingViewer.set_output_image(None)
 
-    # Update currently loaded images + relevant UI
+    # Update currently loaded images + relevant UI (expects sorted image paths)
     def set_loaded_images(self, new_image_files):
         # Clear currently displaying image
         self.ImageWidgets.loaded_images_widget.reset_to_default()
@@ -103,7 +102,7 @@ class CenterWidget(qtw.QWidget):
 
         # Set new files
         settings.globalVars["LoadedImagesWidget"].list.clear()
-        for path in sorted(new_image_files, key=int_string_sorting):
+        for path in new_image_files:
             name = os.path.basename(path)
             item = qtw.QListWidgetItem()
             item.setData(qtc.Qt.UserRole, path)  # Set data to full image path
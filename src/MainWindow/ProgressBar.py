@@ -37,6 +37,9 @@ class ProgressBar(qtw.QWidget):
         If both values are none (default), this widget will be hidden.
         """
         if value:
+            # Leave "busy" state (if set) and make sure progress is shown
+            self.progressbar.setRange(0, 100)
+            self.setVisible(True)
             # Smoothly animate progressbar movement
             if hasattr(self, "animation"):
                 self.animation.stop()
@@ -54,5 +57,18 @@ class ProgressBar(qtw.QWidget):
         if not value and not text:
             # Hide and reset
             self.setVisible(False)
+            self.progressbar.setRange(0, 100)
             self.progressbar.reset()
             self.progress_label.setText("Please wait while the task is beginning...")
+
+    # Display busy indicator for tasks without measurable progress
+    def set_busy(self, text):
+        """
+        Show progressbar in "busy" state (no known progress) with label text.
+        Call "update_value" without arguments to hide and reset.
+        """
+        if hasattr(self, "animation"):
+            self.animation.stop()
+        self.progressbar.setRange(0, 0)
+        self.progress_label.setText(text)
+        self.setVisible(True)
@@ -43,7 +43,7 @@ def setup_actions():
         fileNames, _ = qtw.QFileDialog.getOpenFileNames(
             mainWindow,
             "Select images to load.",
-            mainWindow.current_image_directory,
+            mainWindow.get_recent_directory("load"),
             #options=qtw.QFileDialog.DontUseNativeDialog,  # Required fix for snap
         )
         mainWindow.set_new_loaded_image_files(fileNames)
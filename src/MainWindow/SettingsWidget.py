@@ -45,10 +45,10 @@ class UserInterfaceWidget(qtw.QWidget):
         self.hide()
         self.combobox = qtw.QComboBox(self)
         self.combobox.addItems(self.themes_map_dict)
-        # First set
-        self.combo_box_changed(
-            settings.globalVars["QSettings"].value("user_interface/theme")
-        )
+        # First set; theme is applied once the event loop runs (doesn't delay first paint)
+        saved_index = int(settings.globalVars["QSettings"].value("user_interface/theme"))
+        self.combobox.setCurrentIndex(saved_index)
+        qtc.QTimer.singleShot(0, lambda: self.combo_box_changed(saved_index))
         self.combobox.currentIndexChanged.connect(self.combo_box_changed)
 
         h_layout = qtw.QHBoxLayout()
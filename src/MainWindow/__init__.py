@@ -3,13 +3,14 @@
     It is the "root display".
 """
 import os
+import pathlib
 import PySide6.QtCore as qtc
 import PySide6.QtWidgets as qtw
 
 import src.settings as settings
 import src.MainWindow.QActions as qt_actions_setup
 import src.MainWindow.MainLayout as MainLayout
-import src.MainWindow.Threading as QThreading
+import src.Threading as QThreading
 import src.MainWindow.ProgressBar as ProgressBar
 
 # import src.MainWindow.StackSuccessDialog as StackFinishedDialog
@@ -18,19 +19,29 @@ import src.MainWindow.ImageSavingDialog as ImageSavingDialog
 import src.MainWindow.SettingsWidget as SettingsWidget
 
 import src.algorithms.API as algorithm_API
+import src.utilities as utilities
 
+# Default dir for image loading/export (if none was used before)
 if os.name == "nt":
-    current_image_directory = os.path.expanduser("~")
+    default_image_directory = os.path.expanduser("~")
 else:
     # Probably running in snap --> get real home dir and not the snap's home dir
     import pwd
 
-    current_image_directory = os.path.expanduser(f"~{pwd.getpwuid(os.geteuid())[0]}/")
+    default_image_directory = os.path.expanduser(f"~{pwd.getpwuid(os.geteuid())[0]}/")
+
+# File dialog filters for exporting, with the image type they export as
+EXPORT_FILTERS = {
+    "JPEG (*.jpg *.jpeg)": "JPG",
+    "PNG (*.png)": "PNG",
+    "TIFF (*.tiff *.tif)": "TIFF",
+}
+EXPORT_FILTER_STRING = ";; ".join(EXPORT_FILTERS)
 
 
 class Window(qtw.QMainWindow):
-    # Reference dir for image loading/export
-    current_image_directory = current_image_directory
+    # Max number of output images being exported at the same time
+    max_concurrent_exports = 2
 
     def __init__(self):
         super().__init__()
@@ -59,6 +70,12 @@ class Window(qtw.QMainWindow):
         # Permanent progressbar inside statusbar
         self.progress_widget = ProgressBar.ProgressBar()
         self.statusBar().addPermanentWidget(self.progress_widget)
+        # Exports can run during a stack; they get their own progressbar
+        self.export_progress_widget = ProgressBar.ProgressBar()
+        self.statusBar().addPermanentWidget(self.export_progress_widget)
+        self.num_running_exports = 0
+        # Exports whose encoded image is (queued to be) written to disk
+        self.num_running_writes = 0
 
         # Setup algorithm API
         # TODO: Allow user to change program settings
@@ -66,50 +83,93 @@ class Window(qtw.QMainWindow):
         self.TimeRemainingHandler = TimeRemainingHandler.TimeRemainingHandler()
 
         # Threadpool for multi-threading (prevent UI freezing)
-        self.threadpool = qtc.QThreadPool()
+        # Leave one core for the UI thread; can be overridden with "CHIMPSTACKR_THREADS"
+        self.threadpool = qtc.QThreadPool.globalInstance()
+        num_threads = os.environ.get("CHIMPSTACKR_THREADS")
+        if num_threads and num_threads.isdigit() and int(num_threads) > 0:
+            num_threads = int(num_threads)
+        else:
+            num_threads = max(1, (os.cpu_count() or 1) - 1)
+        self.threadpool.setMaxThreadCount(num_threads)
+        # Separate (small) threadpool for exporting images.
+        # A new stack can start while the previous output is still being written.
+        self.export_threadpool = qtc.QThreadPool()
+        self.export_threadpool.setMaxThreadCount(self.max_concurrent_exports)
+        # Encoded images are written one at a time (concurrent writes compete for the disk)
+        self.write_threadpool = qtc.QThreadPool()
+        self.write_threadpool.setMaxThreadCount(1)
+
+    # Reference dir for file dialogs, remembered per type of file ("load", "export", ...)
+    def get_recent_directory(self, file_class):
+        return settings.globalVars["QSettings"].value(
+            "recent_directories/" + file_class, default_image_directory
+        )
+
+    def set_recent_directory(self, file_class, directory):
+        settings.globalVars["QSettings"].setValue(
+            "recent_directories/" + file_class, directory
+        )
 
     # Export output image to file on disk
     def export_output_image(self):
-        if self.LaplacianAlgorithm.output_image is not None:
+        if self.num_running_exports >= self.max_concurrent_exports:
+            # Check before asking for path/quality, so no user input gets discarded
+            self.show_error_message(
+                "Export busy",
+                "Still exporting previous images.\nPlease try again once an export has finished.\n",
+            )
+        elif self.LaplacianAlgorithm.output_image is not None:
             outputFilePath, usedFilter = qtw.QFileDialog.getSaveFileName(
                 self,
                 "Export stacked image",
-                self.current_image_directory,
-                "JPEG (*.jpg *.jpeg);; PNG (*.png);; TIFF (*.tiff *.tif)",
+                self.get_recent_directory("export"),
+                EXPORT_FILTER_STRING,
                 options=qtw.QFileDialog.DontUseNativeDialog,
             )
             if outputFilePath:
-                outputFilePath = os.path.abspath(outputFilePath)
-                self.current_image_directory = os.path.dirname(outputFilePath)
+                # Path from QFileDialog is already absolute
+                self.set_recent_directory(
+                    "export", str(pathlib.PurePath(outputFilePath).parent)
+                )
 
                 self.statusBar().showMessage(
                     "Exporting output image...", self.statusbar_msg_display_time
                 )
 
                 # Get used image type from filter
-                imgType = None
-                if usedFilter == "JPEG (*.jpg *.jpeg)":
-                    imgType = "JPG"
-                elif usedFilter == "PNG (*.png)":
-                    imgType = "PNG"
-                elif usedFilter == "TIFF (*.tiff *.tif)":
-                    imgType = "TIFF"
+                imgType = EXPORT_FILTERS.get(usedFilter)
 
                 # Attach extension as per selected filter, if not there
                 if not os.path.splitext(outputFilePath)[1]:
                     outputFilePath = outputFilePath + "." + imgType.lower()
 
-                ImageSavingDialog.createDialog(
-                    self.LaplacianAlgorithm.output_image, imgType, outputFilePath
+                accepted, compressionFactor = ImageSavingDialog.createDialog(imgType)
+                if not accepted:
+                    return
+
+                # Encode on worker thread (prevent UI freezing), then write to disk
+                worker = QThreading.Worker(
+                    utilities.encode_image,
+                    self.LaplacianAlgorithm.output_image,
+                    imgType,
+                    compressionFactor,
+                )
+                worker.signals.result.connect(
+                    lambda buffer: self.write_exported_image(buffer, outputFilePath)
                 )
+                worker.signals.error.connect(self.failed_export)
+
+                # Execute; number of running exports is checked above,
+                # so the export threadpool always has a free thread
+                self.num_running_exports += 1
+                self.export_threadpool.start(worker)
+                self.export_progress_widget.set_busy("Exporting output image...")
         else:
             # Display Error message
-            msg = qtw.QMessageBox(self)
-            msg.setStandardButtons(qtw.QMessageBox.Ok)
-            msg.setIcon(qtw.QMessageBox.Critical)
-            msg.setWindowTitle("Export failed")
-            msg.setText("Failed to export!\nPlease load images first.\n")
-            msg.show()
+            self.show_error_message(
+                "Export failed",
+                "Failed to export!\nPlease load images first.\n",
+            )
 
     # Clear all loaded images
     def clear_all_images(self):
@@ -128,13 +188,12 @@ class Window(qtw.QMainWindow):
                 )
                 # Clear loaded and processed images from list
                 settings.globalVars["LoadedImagePaths"] = []
-                self.centralWidget().set_loaded_images(
-                    settings.globalVars["LoadedImagePaths"]
-                )
-                self.LaplacianAlgorithm.update_image_paths(
-                    settings.globalVars["LoadedImagePaths"]
-                )
+                self.LaplacianAlgorithm.update_image_paths([])
+                self.centralWidget().set_loaded_images([])
                 self.centralWidget().add_processed_image(None)
+                # Release (possibly large) output image until next stack
+                self.LaplacianAlgorithm.output_image = None
+                utilities.release_unused_memory()
                 return True
         else:
             # No images were originally loaded
@@ -169,27 +228,22 @@ class Window(qtw.QMainWindow):
 
             if len(invalidPaths) > 0:
                 # Display Error message
-                msg = qtw.QMessageBox(self)
-                msg.setStandardButtons(qtw.QMessageBox.Ok)
-                msg.setIcon(qtw.QMessageBox.Critical)
-                msg.setWindowTitle("Failed to load {} files!".format(len(invalidPaths)))
-                msg.setText(
-                    "Failed to load certain files.\nThey have automatically been excluded.\nPlease ensure a supported format is used.\n"
+                self.show_error_message(
+                    "Failed to load {} files!".format(len(invalidPaths)),
+                    "Failed to load certain files.\nThey have automatically been excluded.\nPlease ensure a supported format is used.\n",
+                    "\n".join(invalidPaths) + "\n",
                 )
-                text = ""
-                for path in invalidPaths:
-                    text += path + "\n"
-                msg.setDetailedText(text)
-                msg.show()
 
             self.statusBar().showMessage(
                 "Loading images...", self.statusbar_msg_display_time
             )
             if len(validPaths) > 0:
-                self.current_image_directory = os.path.dirname(validPaths[0])
-                self.centralWidget().set_loaded_images(validPaths)
+                self.set_recent_directory("load", os.path.dirname(validPaths[0]))
+                # Sort once (by algorithm API); display the same sorted list
                 self.LaplacianAlgorithm.update_image_paths(validPaths)
-                settings.globalVars["LoadedImagePaths"] = validPaths
+                sortedPaths = self.LaplacianAlgorithm.image_paths
+                self.centralWidget().set_loaded_images(sortedPaths)
+                settings.globalVars["LoadedImagePaths"] = sortedPaths
 
     # Save project file to disk
     def save_project_to_file(self):
@@ -208,32 +262,17 @@ class Window(qtw.QMainWindow):
     def align_and_stack_loaded_images(self):
         if len(settings.globalVars["LoadedImagePaths"]) == 0:
             # Display Error message
-            msg = qtw.QMessageBox(self)
-            msg.setStandardButtons(qtw.QMessageBox.Ok)
-            msg.setIcon(qtw.QMessageBox.Critical)
-            msg.setWindowTitle("Stacking failed")
-            msg.setText("Failed to stack images.\nPlease load images first.\n")
-            msg.show()
+            self.show_error_message(
+                "Stacking failed",
+                "Failed to stack images.\nPlease load images first.\n",
+            )
             return
 
         self.statusBar().showMessage(
             "Started aligning & stacking images...", self.statusbar_msg_display_time
         )
 
-        def finished_inter_task(result_list):
-            task_key, num_processed, num_to_process_total, time_taken = result_list
-            if task_key == "finished_image":
-                # Update progressbar slider and "time remaining" text
-                percentage_finished = num_processed / num_to_process_total * 100
-                self.progress_widget.update_value(
-                    percentage_finished,
-                    self.TimeRemainingHandler.calculate_time_remaining(
-                        1 / num_to_process_total * 100,
-                        100 - percentage_finished,
-                        time_taken,
-                    ),
-                )
-
+        finished_inter_task = self.create_stack_progress_handler()
         worker = QThreading.Worker(self.LaplacianAlgorithm.align_and_stack_images)
         worker.signals.finished.connect(self.finished_stack)
         worker.signals.finished_inter_task.connect(finished_inter_task)
@@ -245,39 +284,48 @@ class Window(qtw.QMainWindow):
     def stack_loaded_images(self):
         if len(settings.globalVars["LoadedImagePaths"]) == 0:
             # Display Error message
-            msg = qtw.QMessageBox(self)
-            msg.setStandardButtons(qtw.QMessageBox.Ok)
-            msg.setIcon(qtw.QMessageBox.Critical)
-            msg.setWindowTitle("Stacking failed")
-            msg.setText("Failed to stack images.\nPlease load images first.\n")
-            msg.show()
+            self.show_error_message(
+                "Stacking failed",
+                "Failed to stack images.\nPlease load images first.\n",
+            )
             return
 
         self.statusBar().showMessage(
             "Started stacking images...", self.statusbar_msg_display_time
         )
 
+        finished_inter_task = self.create_stack_progress_handler()
+        worker = QThreading.Worker(self.LaplacianAlgorithm.stack_images)
+        worker.signals.finished.connect(self.finished_stack)
+        worker.signals.finished_inter_task.connect(finished_inter_task)
+
+        # Execute
+        self.threadpool.start(worker)
+        self.progress_widget.setVisible(True)
+
+    # Create handler for progress signals of a stack that is about to start
+    def create_stack_progress_handler(self):
+        # Bind invariants once; handler is called for every processed image
+        num_to_process_total = max(1, len(self.LaplacianAlgorithm.image_paths))
+        percentage_increment = 100.0 / num_to_process_total
+        update_value = self.progress_widget.update_value
+        calculate_time_remaining = self.TimeRemainingHandler.calculate_time_remaining
+
         def finished_inter_task(result_list):
-            task_key, num_processed, num_to_process_total, time_taken = result_list
+            task_key, num_processed, _, time_taken = result_list
             if task_key == "finished_image":
                 # Update progressbar slider and "time remaining" text
-                percentage_finished = num_processed / num_to_process_total * 100
-                self.progress_widget.update_value(
+                percentage_finished = num_processed * percentage_increment
+                update_value(
                     percentage_finished,
-                    self.TimeRemainingHandler.calculate_time_remaining(
-                        1 / num_to_process_total * 100,
+                    calculate_time_remaining(
+                        percentage_increment,
                         100 - percentage_finished,
                         time_taken,
                     ),
                 )
 
-        worker = QThreading.Worker(self.LaplacianAlgorithm.stack_images)
-        worker.signals.finished.connect(self.finished_stack)
-        worker.signals.finished_inter_task.connect(finished_inter_task)
-
-        # Execute
-        self.threadpool.start(worker)
-        self.progress_widget.setVisible(True)
+        return finished_inter_task
 
     # Handle stack finish
     def finished_stack(self):  # , data_dictionary
@@ -289,6 +337,90 @@ class Window(qtw.QMainWindow):
         self.progress_widget.update_value()
         self.centralWidget().add_processed_image(self.LaplacianAlgorithm.output_image)
 
+    # Write encoded output image to disk
+    def write_exported_image(self, buffer, imgPath):
+        # Separate handler; chunk write times don't mix with stacking times
+        time_remaining_handler = TimeRemainingHandler.TimeRemainingHandler()
+
+        def finished_inter_task(result_list):
+            task_key, num_written, num_to_write_total, time_taken = result_list
+            if task_key == "written_bytes":
+                # Update progressbar slider and "time remaining" text
+                percentage_finished = num_written / num_to_write_total * 100
+                self.export_progress_widget.update_value(
+                    percentage_finished,
+                    time_remaining_handler.calculate_time_remaining(
+                        min(utilities.WRITE_CHUNK_SIZE, num_to_write_total)
+                        / num_to_write_total
+                        * 100,
+                        100 - percentage_finished,
+                        time_taken,
+                    ),
+                )
+
+        worker = QThreading.Worker(utilities.write_image, buffer, imgPath)
+        worker.signals.finished_inter_task.connect(finished_inter_task)
+        worker.signals.result.connect(
+            lambda fileSize: self.finished_export(imgPath, fileSize)
+        )
+        worker.signals.error.connect(self.failed_write)
+        self.num_running_writes += 1
+        self.write_threadpool.start(worker)
+
+    # Handle export finish (always after writing)
+    def finished_export(self, imgPath, fileSize):
+        self.num_running_writes -= 1
+        self.export_stopped()
+        self.show_export_result(imgPath, None, fileSize)
+
+    # Handle uncaught error during writing of export
+    def failed_write(self, error):
+        self.num_running_writes -= 1
+        self.failed_export(error)
+
+    # Handle uncaught error during export
+    def failed_export(self, error):
+        exctype, value, formatted_traceback = error
+        self.export_stopped()
+        self.show_export_result(None, formatted_traceback)
+
+    # Update export progressbar after an export finished/failed
+    def export_stopped(self):
+        self.num_running_exports -= 1
+        if self.num_running_exports <= 0:
+            self.export_progress_widget.update_value()
+        elif self.num_running_writes <= 0:
+            # Other export is still encoding (no known progress)
+            self.export_progress_widget.set_busy("Exporting output image...")
+        # Otherwise leave progressbar to the export that is being written
+
+    # Display export result; dialog is created once and reused
+    def show_export_result(self, imgPath, errorStackTrace, fileSize=0):
+        if not hasattr(self, "export_result_dialog"):
+            self.export_result_dialog = ImageSavingDialog.ResultDialog()
+            self.pending_export_results = []
+        self.pending_export_results.append((imgPath, errorStackTrace, fileSize))
+        # Dialog already shown (other export finished first):
+        # result is displayed once the user closed the current one
+        if self.export_result_dialog.isVisible():
+            return
+
+        while len(self.pending_export_results) > 0:
+            self.export_result_dialog.set_result(*self.pending_export_results.pop(0))
+            self.export_result_dialog.exec()
+
+    # Display error message; message box is created once and reused
+    def show_error_message(self, title, text, detailedText=""):
+        if not hasattr(self, "error_message_box"):
+            self.error_message_box = qtw.QMessageBox(self)
+            self.error_message_box.setStandardButtons(qtw.QMessageBox.Ok)
+            self.error_message_box.setIcon(qtw.QMessageBox.Critical)
+        self.error_message_box.setWindowTitle(title)
+        self.error_message_box.setText(text)
+        # Empty text removes "Show Details..." button
+        self.error_message_box.setDetailedText(detailedText)
+        self.error_message_box.show()
+
     """
         Overridden signals
     """
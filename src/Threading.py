@@ -1,15 +1,18 @@
 """
     Classes that enable easy threading.
     Used to prevent UI freezing when running long tasks.
+    Only depends on QtCore; kept outside "src.MainWindow" so it can be used without GUI (tests).
     src: https://www.pythonguis.com/tutorials/multithreading-pyqt-applications-qthreadpool/
 """
 import PySide6.QtCore as qtc
-import traceback, sys
+import traceback, sys, time
 
 # Signals available from a running worker thread
 class WorkerSignals(qtc.QObject):
     # Fire when process finishes
     finished = qtc.Signal()
+    # Return value of the task (only emitted if no error occurred)
+    result = qtc.Signal(object)
     # Error message
     # TODO: Use error signal
     error = qtc.Signal(tuple)
@@ -19,6 +22,37 @@ class WorkerSignals(qtc.QObject):
     # General signal to call once part of a task has finished
     finished_inter_task = qtc.Signal(list)
 
+    # Min. progress (%) or time (s) between two "finished_inter_task" signals
+    inter_task_min_percentage = 1
+    inter_task_min_interval = 0.1
+
+    def __init__(self):
+        super().__init__()
+        # (percentage, timestamp) of last sent "finished_inter_task" signal
+        self.last_inter_task = (float("-inf"), float("-inf"))
+
+    def emit_inter_task(self, result_list):
+        """
+        Emit "finished_inter_task" signal, throttled to prevent flooding the UI thread:
+        skipped if progress changed less than 1% and less than 100ms passed since the last one.
+        The final signal (all parts processed) is always sent.
+
+        :param result_list: [task_key, num_processed, num_to_process_total, time_taken]
+        """
+        num_processed, num_to_process_total = result_list[1], result_list[2]
+        percentage = num_processed / num_to_process_total * 100
+        now = time.perf_counter()
+        last_percentage, last_time = self.last_inter_task
+        if (
+            num_processed < num_to_process_total
+            and percentage - last_percentage < self.inter_task_min_percentage
+            and now - last_time < self.inter_task_min_interval
+        ):
+            return
+
+        self.last_inter_task = (percentage, now)
+        self.finished_inter_task.emit(result_list)
+
 
 class Worker(qtc.QRunnable):
     """
@@ -48,12 +82,14 @@ class Worker(qtc.QRunnable):
 
         # Retrieve args/kwargs here; and fire processing using them
         try:
-            self.fn(*self.args, self.signals)
+            result = self.fn(*self.args, self.signals)
         except:
             # Emit error message
             traceback.print_exc()
             exctype, value = sys.exc_info()[:2]
             self.signals.error.emit((exctype, value, traceback.format_exc()))
+        else:
+            self.signals.result.emit(result)
 
         # Emit finished signal
         self.signals.finished.emit()
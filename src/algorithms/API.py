@@ -103,7 +103,7 @@ class LaplacianPyramid:
 
             if self.use_pyqt:
                 # Send progress signal
-                signals.finished_inter_task.emit(
+                signals.emit_inter_task(
                     [
                         "finished_image",
                         i + 1,
@@ -160,7 +160,7 @@ class LaplacianPyramid:
 
             # Send progress signal
             if self.use_pyqt:
-                signals.finished_inter_task.emit(
+                signals.emit_inter_task(
                     [
                         "finished_image",
                         i + 1,
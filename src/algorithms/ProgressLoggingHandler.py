@@ -5,9 +5,8 @@ Data can be retrieved once finished, to display in a graph.
 
 # TODO: Implement
 class Logger:
-    time_stamps = {}
-
     def __init__(self, signals):
+        self.time_stamps = {}
         self.signals = signals
         signals.finished.connect(self.finished)
         signals.progress_update.connect(self.progress_update)
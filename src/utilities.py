@@ -2,10 +2,18 @@
     Utility functions for UI/algorithm.
 """
 
+import ctypes
+import gc
+import os
 import re
+import sys
+import time
 import numpy as np
 import cv2
 
+# Size of chunks (bytes) written at once by "write_image"; progress is sent (at most) per chunk
+WRITE_CHUNK_SIZE = 2**20
+
 
 # Sort strings numerically; src: https://stackoverflow.com/questions/3426108/how-to-sort-a-list-of-strings-numerically
 # Correctly handles: 11, 1, 2 --> 1, 2, 11
@@ -20,8 +28,15 @@ def int_string_sorting(text):
     return [atof(c) for c in re.split(r"[+-]?([0-9]+(?:[.][0-9]*)?|[.][0-9]+)", text)]
 
 
-def save_image(imageArray, imType, imgPath, compressionFactor=None):
+def encode_image(imageArray, imType, compressionFactor=None, signals=None):
+    """
+    Convert image to the output type's dtype and encode it in memory.
+    Returns encoded image buffer (1D uint8 ndarray); raises on failure.
+    Accepts (unused) "signals" so it can directly run on a QThreading.Worker.
+    """
     imType = imType.lower()
+    # Use same extension names as the compression dict below
+    imType = {"jpeg": "jpg", "tiff": "tif"}.get(imType, imType)
 
     # Get compression/quality for JPG and PNG (don't compress tiff)
     compression_list_dict = {
@@ -44,17 +59,66 @@ def save_image(imageArray, imType, imgPath, compressionFactor=None):
         imageArray = imageArray.astype(np.uint8)
     elif imType == "tif":
         # Convert float32 image to uint16 for TIFF:
-        imageArray *= 2.0**8  # scale to 16bit dynamic range
+        # Scale to 16bit dynamic range (new array; source may still be in use)
+        imageArray = imageArray * 2.0**8
         imageArray = np.around(imageArray)
         imageArray[imageArray > 65535] = 65535
         imageArray[imageArray < 0] = 0
         imageArray = imageArray.astype(np.uint16)
 
+    success, buffer = cv2.imencode(
+        "." + imType, imageArray, compression_list_dict[imType]
+    )
+    if not success:
+        raise ValueError("Failed to encode image as: " + imType)
+    return buffer
+
+
+def write_image(buffer, imgPath, signals=None, chunk_size=WRITE_CHUNK_SIZE):
+    """
+    Write encoded image buffer to disk (in chunks). Returns size of the written file.
+    If "signals" are passed (QThreading.Worker), progress is sent after chunks (throttled).
+    """
+    view = memoryview(buffer).cast("B")
+    with open(imgPath, "wb") as f:
+        for offset in range(0, len(view), chunk_size):
+            start_time = time.time()
+            f.write(view[offset : offset + chunk_size])
+
+            # Send progress signal
+            if signals is not None:
+                signals.emit_inter_task(
+                    [
+                        "written_bytes",
+                        min(offset + chunk_size, len(view)),
+                        len(view),
+                        time.time() - start_time,
+                    ]
+                )
+    return os.path.getsize(imgPath)
+
+
+def save_image(imageArray, imType, imgPath, compressionFactor=None):
+    """
+    Encode and save image to disk. Returns error (if any), otherwise None.
+    """
     # Try saving image to disk
     errorStackTrace = None
     try:
-        cv2.imwrite(imgPath, imageArray, compression_list_dict[imType])
+        write_image(encode_image(imageArray, imType, compressionFactor), imgPath)
     except Exception as e:
         errorStackTrace = e
 
     return errorStackTrace
+
+
+def release_unused_memory():
+    """
+    Collect garbage and (on Linux with glibc) return freed heap memory to the OS.
+    """
+    gc.collect()
+    if sys.platform.startswith("linux"):
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass  # Not glibc
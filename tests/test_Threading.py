@@ -0,0 +1,62 @@
+"""
+Test throttling of progress signals sent from worker threads.
+"""
+import os, sys, itertools
+
+currentdir = os.path.dirname(os.path.realpath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+import numpy as np
+import PySide6.QtCore as qtc
+
+import src.Threading as QThreading
+import src.utilities as utilities
+
+
+def connect_signals():
+    signals = QThreading.WorkerSignals()
+    emitted = []
+    # Direct connection: no event loop is running to deliver queued signals
+    signals.finished_inter_task.connect(emitted.append, qtc.Qt.DirectConnection)
+    return signals, emitted
+
+
+def test_emit_inter_task_throttles_small_steps(monkeypatch):
+    # No time passes; only progress (>= 1%) lets signals through
+    monkeypatch.setattr(QThreading.time, "perf_counter", lambda: 0.0)
+    signals, emitted = connect_signals()
+
+    # Steps of ~0.4%; every 3rd step passes 1% (1, 4, 7, ..., 250), then final 251
+    total = 251
+    for i in range(1, total + 1):
+        signals.emit_inter_task(["finished_image", i, total, 0.0])
+
+    assert [result[1] for result in emitted] == list(range(1, 251, 3)) + [251]
+    # First and final signals are always sent
+    assert emitted[0][1] == 1
+    assert emitted[-1] == ["finished_image", total, total, 0.0]
+
+
+def test_emit_inter_task_sends_after_interval(monkeypatch):
+    # 200ms pass between calls; every signal is sent, however small the step
+    counter = itertools.count(step=0.2)
+    monkeypatch.setattr(QThreading.time, "perf_counter", lambda: next(counter))
+    signals, emitted = connect_signals()
+
+    total = 1000
+    for i in range(1, total + 1):
+        signals.emit_inter_task(["finished_image", i, total, 0.0])
+
+    assert len(emitted) == total
+
+
+def test_write_image_always_sends_final_progress(monkeypatch, tmp_path):
+    monkeypatch.setattr(QThreading.time, "perf_counter", lambda: 0.0)
+    signals, emitted = connect_signals()
+    buffer = np.zeros(1000, dtype=np.uint8)
+
+    utilities.write_image(buffer, str(tmp_path / "output.bin"), signals, chunk_size=1)
+
+    assert 1 < len(emitted) < buffer.size
+    assert emitted[-1][:3] == ["written_bytes", buffer.size, buffer.size]
@@ -1,39 +1,83 @@
 """
 Test multiple functions of algorithm API.
 """
-# TODO: Re-activate. Error on Pyside6.QtWidgets import:
-# TODO: ImportError: libEGL.so.1: cannot open shared object file: No such file or directory
-# import os, sys, tempfile
-# import numpy as np
-# import PySide6.QtCore as qtc
+# Don't import GUI modules (src.MainWindow) here; PySide6.QtWidgets fails on headless CI:
+# ImportError: libEGL.so.1: cannot open shared object file: No such file or directory
+import os, sys
+import numpy as np
+import pytest
+import PySide6.QtCore as qtc
 
-# currentdir = os.path.dirname(os.path.realpath(__file__))
-# parentdir = os.path.dirname(currentdir)
-# sys.path.insert(0, parentdir)
+currentdir = os.path.dirname(os.path.realpath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
 
-# import src.MainWindow.Threading as QThreading
-# import src.algorithm.API as API
+import src.Threading as QThreading
+import src.algorithms.API as API
+import src.settings as settings
+import src.utilities as utilities
 
-# ROOT_TEMP_DIRECTORY = tempfile.TemporaryDirectory(prefix="FocusStacking_")
+settings.init()
 
-# laplacian_pyramid_algorithm = API.LaplacianPyramid(ROOT_TEMP_DIRECTORY)
+IMAGES_DIRECTORY = os.path.join(currentdir, "low_res_images")
+IMAGE_PATHS = [os.path.join(IMAGES_DIRECTORY, p) for p in os.listdir(IMAGES_DIRECTORY)]
+# Max time to wait for workers to finish (ms)
+WORKER_TIMEOUT = 5 * 60 * 1000
 
-# # Test image loading (+clearing)
-# def test_image_paths_update():
-#     laplacian_pyramid_algorithm.update_image_paths(os.listdir("tests/low_res_images"))
-#     assert len(laplacian_pyramid_algorithm.image_paths) == 10
 
-# # TODO: Test aligning images
+# Test image loading (+clearing)
+def test_image_paths_update():
+    # No QSettings/GUI available; don't emit progress signals
+    laplacian_pyramid_algorithm = API.LaplacianPyramid(use_pyqt=False)
+    sorted_paths = sorted(IMAGE_PATHS, key=utilities.int_string_sorting)
+    # Loaded paths are used as-is by the UI; check they get (naturally) sorted
+    laplacian_pyramid_algorithm.update_image_paths(sorted_paths[::-1])
+    assert len(laplacian_pyramid_algorithm.image_paths) == 10
+    assert laplacian_pyramid_algorithm.image_paths == sorted_paths
+    assert [os.path.basename(p) for p in sorted_paths][:3] == [
+        "DSC_0356.jpg",
+        "DSC_0358.jpg",
+        "DSC_0359.jpg",
+    ]
 
-# # Test stacking images
-# def test_image_stacking():
-#     worker = QThreading.Worker(laplacian_pyramid_algorithm.stack_images)
-#     threadpool = qtc.QThreadPool()
+    laplacian_pyramid_algorithm.update_image_paths([])
+    assert len(laplacian_pyramid_algorithm.image_paths) == 0
 
-#     def finished_stack():
-#         assert type(laplacian_pyramid_algorithm.output_image) == np.ndarray
-#         assert laplacian_pyramid_algorithm.output_image.shape == (4000, 6000, 3)
-#         assert laplacian_pyramid_algorithm.output_image.dtype == np.uint8
 
-#     worker.signals.finished.connect(finished_stack)
-#     threadpool.start(worker)
+# TODO: Test aligning images
+
+# Test stacking images; disjoint image subsets (split at given bounds) stack concurrently
+# Second case has more subsets than (usual) threads; some workers wait in the queue
+@pytest.mark.parametrize("subset_bounds", [(2, 5, 10), tuple(range(1, 11))])
+def test_image_stacking(subset_bounds):
+    algorithms = []
+    workers = []
+    errors = []
+    for start, end in zip((0,) + subset_bounds, subset_bounds):
+        laplacian_pyramid_algorithm = API.LaplacianPyramid(use_pyqt=False)
+        laplacian_pyramid_algorithm.update_image_paths(IMAGE_PATHS[start:end])
+
+        worker = QThreading.Worker(laplacian_pyramid_algorithm.stack_images)
+        # Keep worker alive after it ran, so its signals can still be inspected
+        worker.setAutoDelete(False)
+        # Direct connection: no event loop is running to deliver queued signals
+        worker.signals.error.connect(errors.append, qtc.Qt.DirectConnection)
+
+        algorithms.append(laplacian_pyramid_algorithm)
+        workers.append(worker)
+
+    threadpool = qtc.QThreadPool.globalInstance()
+    for worker in workers:
+        threadpool.start(worker)
+    # Wait (with timeout) for stacks to finish
+    finished = threadpool.waitForDone(WORKER_TIMEOUT)
+    if not finished:
+        # Drop workers that haven't started yet (running ones can't be stopped)
+        threadpool.clear()
+    assert finished
+
+    assert errors == []
+    for laplacian_pyramid_algorithm in algorithms:
+        assert type(laplacian_pyramid_algorithm.output_image) == np.ndarray
+        assert laplacian_pyramid_algorithm.output_image.shape == (500, 750, 3)
+        assert laplacian_pyramid_algorithm.output_image.dtype == np.float32
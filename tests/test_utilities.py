@@ -0,0 +1,103 @@
+"""
+Test encoding/writing of output images.
+"""
+import os, sys
+
+currentdir = os.path.dirname(os.path.realpath(__file__))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+import cv2
+import numpy as np
+import pytest
+
+import src.utilities as utilities
+
+# Small float32 image (like the stacking output), values in 8bit range
+rng = np.random.default_rng(0)
+float_image = rng.uniform(0, 255, size=(16, 24, 3)).astype(np.float32)
+
+
+@pytest.mark.parametrize(
+    "imType, dtype", [("jpg", np.uint8), ("png", np.uint8), ("tif", np.uint16)]
+)
+def test_save_image(tmp_path, imType, dtype):
+    path = str(tmp_path / ("output." + imType))
+    assert utilities.save_image(float_image, imType, path) is None
+
+    img = cv2.imread(path, -1)
+    assert img.shape == float_image.shape
+    assert img.dtype == dtype
+
+
+def test_save_image_lossless_values(tmp_path):
+    png_path = str(tmp_path / "output.png")
+    tif_path = str(tmp_path / "output.tif")
+    utilities.save_image(float_image, "png", png_path)
+    utilities.save_image(float_image, "tif", tif_path)
+
+    assert np.array_equal(
+        cv2.imread(png_path, -1), np.around(float_image).astype(np.uint8)
+    )
+    # TIFF is scaled to 16bit dynamic range
+    assert np.array_equal(
+        cv2.imread(tif_path, -1), np.around(float_image * 2.0**8).astype(np.uint16)
+    )
+
+
+def test_save_image_returns_error(tmp_path):
+    path = str(tmp_path / "missing_directory" / "output.jpg")
+    assert utilities.save_image(float_image, "jpg", path) is not None
+
+
+def test_encode_image_type_aliases():
+    jpg = utilities.encode_image(float_image, "jpg")
+    assert np.array_equal(utilities.encode_image(float_image, "jpeg"), jpg)
+    assert np.array_equal(utilities.encode_image(float_image, "JPG"), jpg)
+
+    tif = utilities.encode_image(float_image, "tif")
+    assert np.array_equal(utilities.encode_image(float_image, "tiff"), tif)
+    assert np.array_equal(utilities.encode_image(float_image, "TIFF"), tif)
+
+
+def test_encode_image_keeps_source_unchanged():
+    source = float_image.copy()
+    for imType in ["jpg", "png", "tif"]:
+        utilities.encode_image(source, imType)
+        assert np.array_equal(source, float_image)
+
+
+def test_encode_image_raises_on_failure(monkeypatch):
+    with pytest.raises(KeyError):
+        utilities.encode_image(float_image, "unknown")
+
+    monkeypatch.setattr(utilities.cv2, "imencode", lambda *args: (False, None))
+    with pytest.raises(ValueError):
+        utilities.encode_image(float_image, "png")
+
+
+def test_write_image_returns_file_size(tmp_path):
+    path = str(tmp_path / "output.png")
+    buffer = utilities.encode_image(float_image, "png")
+
+    size = utilities.write_image(buffer, path)
+    assert size == os.path.getsize(path)
+    assert size == buffer.size
+    assert np.array_equal(np.fromfile(path, dtype=np.uint8), buffer.ravel())
+
+
+def test_write_image_sends_progress_per_chunk(tmp_path):
+    class Signals:
+        def __init__(self):
+            self.emitted = []
+
+        def emit_inter_task(self, result_list):
+            self.emitted.append(result_list)
+
+    signals = Signals()
+    buffer = np.arange(5, dtype=np.uint8)
+    utilities.write_image(buffer, str(tmp_path / "output.bin"), signals, chunk_size=1)
+
+    assert [result[:3] for result in signals.emitted] == [
+        ["written_bytes", i, 5] for i in range(1, 6)
+    ]